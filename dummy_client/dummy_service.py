@@ -137,3 +137,54 @@ class ServiceDummy(Service):
     def getColorMap(self, ip, port):
         self.run_client(ip=ip, port=port, request='getColorMap',
                         response_handler=self.__resp_hand_get_cm)
+
+    # getStartup
+    def __resp_hand_get_startup(self, response):
+        print(f"Received: {response}")
+
+    def getStartup(self, ip, port):
+        self.run_client(ip=ip, port=port, request='getStartup',
+                        response_handler=self.__resp_hand_get_startup)
+
+    # applyDetectScale
+    def __resp_hand_apply_detect_scale(self, response):
+        print(f"Received: {response}")
+
+    def applyDetectScale(self, ip, port, scale):
+        _scale = 'applyDetectScale_' + str(scale)
+        self.run_client(ip=ip, port=port, request=_scale,
+                        response_handler=self.__resp_hand_apply_detect_scale)
+
+    # applyDetectRoi
+    def __resp_hand_apply_detect_roi(self, response):
+        print(f"Received: {response}")
+
+    def applyDetectRoi(self, ip, port, mode):
+        _mode = 'applyDetectRoi_' + str(mode)
+        self.run_client(ip=ip, port=port, request=_mode,
+                        response_handler=self.__resp_hand_apply_detect_roi)
+
+    # applyQuality
+    def __resp_hand_apply_quality(self, response):
+        print(f"Received: {response}")
+
+    def applyQuality(self, ip, port, name, value):
+        _quality = 'applyQuality_' + name + '_' + str(value)
+        self.run_client(ip=ip, port=port, request=_quality,
+                        response_handler=self.__resp_hand_apply_quality)
+
+    # getQuality
+    def __resp_hand_get_quality(self, response):
+        print(f"Received: {response}")
+
+    def getQuality(self, ip, port):
+        self.run_client(ip=ip, port=port, request='getQuality',
+                        response_handler=self.__resp_hand_get_quality)
+
+    # getIdentity
+    def __resp_hand_get_identity(self, response):
+        print(f"Received: {response}")
+
+    def getIdentity(self, ip, port):
+        self.run_client(ip=ip, port=port, request='getIdentity',
+                        response_handler=self.__resp_hand_get_identity)
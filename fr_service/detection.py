@@ -0,0 +1,155 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+
+class DetectionCascade:
+    """
+    Класс DetectionCascade для детектирования лиц на уменьшенной копии кадра.
+
+    Детектор (mediapipe) запускается на уменьшенном кадре, при необходимости только внутри областей интереса
+    (движение или трек), а найденные прямоугольники переносятся на исходный кадр, из которого вырезаются
+    кропы в полном разрешении.
+
+    :scale (float): Коэффициент уменьшения кадра для детектора, (0., 1.].
+    :roi_padding (float): Расширение областей трека относительно их размера.
+    :motion_threshold (int): Порог разности кадров для маски движения.
+    :min_motion_area (int): Минимальная площадь области движения в пикселях уменьшенного кадра.
+    """
+    def __init__(self, scale=0.5, roi_padding=0.5,
+                 motion_threshold=25, min_motion_area=100):
+        """
+        Инициализация каскада.
+
+        :param scale (float): Коэффициент уменьшения кадра. По умолчанию 0.5.
+        :param roi_padding (float): Расширение областей трека. По умолчанию 0.5.
+        :param motion_threshold (int): Порог разности кадров. По умолчанию 25.
+        :param min_motion_area (int): Минимальная площадь области движения. По умолчанию 100.
+        """
+        self.scale = scale
+        self.roi_padding = roi_padding
+        self.motion_threshold = motion_threshold
+        self.min_motion_area = min_motion_area
+
+        self.__detector = None
+        self.__prev_gray = None
+
+    def __detect_faces(self, img: np.ndarray) -> list:
+        """
+        Приватный метод запуска детектора mediapipe. Модель детектора загружается при первом вызове.
+
+        :param img: Изображение в формате BGR.
+        :type img: np.ndarray
+        :return: Список кортежей (кроп, [x, y, w, h], confidence).
+        :rtype: list
+        """
+        from deepface.detectors import FaceDetector
+        if self.__detector is None:
+            self.__detector = FaceDetector.build_model('mediapipe')
+        return FaceDetector.detect_faces(self.__detector, 'mediapipe', img, align=False)
+
+    def motion_rois(self, small: np.ndarray) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Области движения на уменьшенном кадре относительно предыдущего вызова.
+
+        :param small: Уменьшенный кадр в формате BGR.
+        :type small: np.ndarray
+        :return: Список прямоугольников (x, y, w, h) в координатах уменьшенного кадра
+            или None, если предыдущего кадра нет и нужно обработать кадр целиком.
+        :rtype: list | None
+        """
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        prev, self.__prev_gray = self.__prev_gray, gray
+        if prev is None or prev.shape != gray.shape:
+            return None
+        diff = cv2.absdiff(prev, gray)
+        _, mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= self.min_motion_area]
+
+    def __scale_rois(self, rois, shape, scale: float) -> List[Tuple[int, int, int, int]]:
+        """
+        Приватный метод переноса областей трека с исходного кадра на уменьшенный с расширением на `roi_padding`.
+
+        :param rois: Прямоугольники в координатах исходного кадра (словари x, y, w, h или кортежи).
+        :param shape: Размер уменьшенного кадра.
+        :param scale: Коэффициент уменьшения кадра.
+        :rtype: list
+        """
+        scaled = []
+        for roi in rois:
+            if isinstance(roi, dict):
+                roi = (roi['x'], roi['y'], roi['w'], roi['h'])
+            x, y, w, h = roi
+            pad_w, pad_h = w * self.roi_padding, h * self.roi_padding
+            x0 = max(0, int((x - pad_w) * scale))
+            y0 = max(0, int((y - pad_h) * scale))
+            x1 = min(shape[1], int((x + w + pad_w) * scale))
+            y1 = min(shape[0], int((y + h + pad_h) * scale))
+            if x1 > x0 and y1 > y0:
+                scaled.append((x0, y0, x1 - x0, y1 - y0))
+        return scaled
+
+    def detect(self, frame: np.ndarray, rois=None, use_motion=False) -> list:
+        """
+        Детектирование лиц с кропами из кадра в полном разрешении.
+
+        :param frame: Исходный кадр в формате BGR.
+        :type frame: np.ndarray
+        :param rois: Области трека в координатах исходного кадра; None - весь кадр.
+        :type rois: list, optional
+        :param use_motion: Ограничить поиск областями движения.
+        :type use_motion: bool
+        :return: Список словарей с ключами 'face' (RGB, float32 в [0, 1], как у `DeepFace.extract_faces`),
+            'crop' (тот же кроп в формате BGR, uint8), 'facial_area' (x, y, w, h в координатах исходного кадра)
+            и 'confidence', по убыванию confidence.
+        :rtype: list
+        """
+        # Масштаб читается один раз: `scale` может смениться запросом из другого потока посреди кадра
+        scale = self.scale
+        small = frame
+        if scale != 1.0:
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        regions = []
+        if rois:
+            regions.extend(self.__scale_rois(rois, small.shape, scale))
+        if use_motion:
+            motion = self.motion_rois(small)
+            if motion is None:
+                regions = []
+            else:
+                regions.extend(motion)
+                if not regions:
+                    return []
+
+        # Все области объединяются в один прямоугольник, чтобы детектор запускался один раз
+        if regions:
+            x0 = min(r[0] for r in regions)
+            y0 = min(r[1] for r in regions)
+            x1 = max(r[0] + r[2] for r in regions)
+            y1 = max(r[1] + r[3] for r in regions)
+        else:
+            x0, y0, x1, y1 = 0, 0, small.shape[1], small.shape[0]
+
+        faces = []
+        for _, region, confidence in self.__detect_faces(small[y0:y1, x0:x1]):
+            x, y, w, h = region
+            fx = max(0, int(round((x + x0) / scale)))
+            fy = max(0, int(round((y + y0) / scale)))
+            fw = min(frame.shape[1] - fx, int(round(w / scale)))
+            fh = min(frame.shape[0] - fy, int(round(h / scale)))
+            crop = frame[fy:fy + fh, fx:fx + fw]
+            if crop.size == 0:
+                continue
+            faces.append({
+                'face': (crop[:, :, ::-1] / 255.).astype(np.float32),
+                'crop': crop.copy(),
+                'facial_area': {'x': fx, 'y': fy, 'w': fw, 'h': fh},
+                'confidence': confidence,
+            })
+        faces.sort(key=lambda f: f['confidence'], reverse=True)
+        return faces
@@ -0,0 +1,278 @@
+import io
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+INDEX_NAME = 'events.idx'
+SEGMENT_TEMPLATE = 'events_{:06d}.bin'
+CROPS_DIR = 'crops'
+
+
+class EventLog:
+    """
+    Класс EventLog - журнал событий распознавания, доступный только для добавления.
+
+    `log` лишь кладет запись в очередь, поэтому не блокирует обработку кадров. Фоновый поток собирает записи в пакеты
+    и дописывает каждый пакет в текущий сегмент блоком: 4 байта длины (как в сообщениях
+    :class:`fr_service.service.Service`) и колонки пакета в формате .npz. Сегмент ротируется при превышении
+    `max_segment_bytes`. Для каждого блока в индекс `events.idx` добавляется строка JSON с его положением,
+    диапазоном времени и набором личностей, по которому :class:`EventLogReader` выбирает блоки для чтения.
+
+    :directory (str): Каталог журнала.
+    :batch_size (int): Максимальное количество записей в блоке.
+    :flush_interval (float): Максимальное время накопления пакета в секундах.
+    :max_segment_bytes (int): Размер сегмента, после которого начинается новый.
+    :save_crops (bool): Сохранять ли кропы лиц в каталог `crops`.
+    :dropped (int): Количество записей, отброшенных из-за переполнения очереди.
+    """
+    def __init__(self, directory: str, batch_size=256, flush_interval=1.0, max_segment_bytes=64 * 1024 * 1024,
+                 save_crops=False, max_queue=10000):
+        """
+        Инициализация журнала и запуск фонового потока записи.
+
+        :param directory (str): Каталог журнала, создается при необходимости.
+        :param batch_size (int): Максимальное количество записей в блоке. По умолчанию 256.
+        :param flush_interval (float): Максимальное время накопления пакета в секундах. По умолчанию 1.
+        :param max_segment_bytes (int): Размер сегмента для ротации. По умолчанию 64 МБ.
+        :param save_crops (bool): Сохранять ли кропы лиц. По умолчанию False.
+        :param max_queue (int): Максимальный размер очереди записей. По умолчанию 10000.
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.save_crops = save_crops
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        if save_crops:
+            os.makedirs(os.path.join(directory, CROPS_DIR), exist_ok=True)
+        segments = [name for name in os.listdir(directory)
+                    if name.startswith('events_') and name.endswith('.bin')]
+        self.__segment = max((int(name[7:-4]) for name in segments), default=0)
+        self.__n_crops = 0
+
+        self.__queue = queue.Queue(maxsize=max_queue)
+        thread = threading.Thread(target=self.__writer, name='event_log_writer')
+        thread.daemon = True
+        thread.start()
+
+    def log(self, camera: str, track: int, identity: str, score: float, box,
+            crop: Optional[np.ndarray] = None) -> None:
+        """
+        Добавление записи о событии распознавания. Не блокирует: при переполнении очереди запись отбрасывается.
+
+        :param camera: Идентификатор камеры.
+        :type camera: str
+        :param track: Номер трека.
+        :type track: int
+        :param identity: Распознанная личность.
+        :type identity: str
+        :param score: Косинусное расстояние (NaN, если шарды галереи не вернули результата).
+        :type score: float
+        :param box: Прямоугольник лица: словарь x, y, w, h или последовательность [x, y, w, h].
+        :param crop: Кроп лица в формате BGR, сохраняется при `save_crops`, опциональный параметр.
+        :type crop: np.ndarray, optional
+        :rtype: None
+        """
+        if isinstance(box, dict):
+            box = (box['x'], box['y'], box['w'], box['h'])
+        if not self.save_crops:
+            crop = None
+        try:
+            self.__queue.put_nowait((time.time(), str(camera), int(track), str(identity), float(score),
+                                     tuple(box), crop))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание записи всех поставленных в очередь событий.
+
+        :param timeout: Максимальное время ожидания в секундах, опциональный параметр.
+        :type timeout: float, optional
+        :return: True, если все записи сохранены.
+        :rtype: bool
+        """
+        done = threading.Event()
+        self.__queue.put(done)
+        return done.wait(timeout)
+
+    def __writer(self) -> None:
+        """
+        Приватный метод фонового потока: накопление пакетов и их запись.
+
+        :rtype: None
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.__queue.get(timeout=max(0., deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if isinstance(item, threading.Event):
+                self.__write_batch(batch)
+                batch = []
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self.__write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def __save_crop(self, crop: Optional[np.ndarray], timestamp: float) -> str:
+        """
+        Приватный метод сохранения кропа лица в формате JPEG.
+
+        :param crop: Кроп лица в формате BGR или None.
+        :param timestamp: Время события, используется в имени файла.
+        :return: Путь к кропу относительно каталога журнала или пустая строка.
+        :rtype: str
+        """
+        if crop is None:
+            return ''
+        import cv2
+        self.__n_crops += 1
+        ref = os.path.join(CROPS_DIR, f'{int(timestamp * 1000)}_{self.__n_crops:08d}.jpg')
+        cv2.imwrite(os.path.join(self.directory, ref), crop)
+        return ref
+
+    def __write_batch(self, batch: list) -> None:
+        """
+        Приватный метод записи пакета блоком в текущий сегмент и добавления строки в индекс.
+
+        :param batch: Список записей.
+        :type batch: list
+        :rtype: None
+        """
+        if not batch:
+            return
+        try:
+            columns = {
+                'timestamp': np.array([r[0] for r in batch], dtype=np.float64),
+                'camera': np.array([r[1] for r in batch], dtype=np.str_),
+                'track': np.array([r[2] for r in batch], dtype=np.int32),
+                'identity': np.array([r[3] for r in batch], dtype=np.str_),
+                'score': np.array([r[4] for r in batch], dtype=np.float32),
+                'box': np.array([r[5] for r in batch], dtype=np.int32).reshape(-1, 4),
+                'crop': np.array([self.__save_crop(r[6], r[0]) for r in batch], dtype=np.str_),
+            }
+            buf = io.BytesIO()
+            np.savez_compressed(buf, **columns)
+            data = buf.getvalue()
+
+            path = os.path.join(self.directory, SEGMENT_TEMPLATE.format(self.__segment))
+            if os.path.exists(path) and os.path.getsize(path) + len(data) + 4 > self.max_segment_bytes:
+                self.__segment += 1
+                path = os.path.join(self.directory, SEGMENT_TEMPLATE.format(self.__segment))
+            with open(path, 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(struct.pack('>I', len(data)) + data)
+
+            block = {
+                'segment': self.__segment,
+                'offset': offset,
+                'count': len(batch),
+                't_min': float(columns['timestamp'].min()),
+                't_max': float(columns['timestamp'].max()),
+                'identities': sorted(set(columns['identity'].tolist())),
+            }
+            with open(os.path.join(self.directory, INDEX_NAME), 'a') as f:
+                f.write(json.dumps(block) + '\n')
+        except Exception as e:
+            print('Event log write error:', e)
+
+
+class EventLogReader:
+    """
+    Класс EventLogReader для выборки событий из журнала :class:`EventLog` по диапазону времени и личности.
+
+    Читаются только блоки, которые по индексу могут содержать подходящие записи.
+
+    :directory (str): Каталог журнала.
+    """
+    def __init__(self, directory: str):
+        """
+        Инициализация.
+
+        :param directory (str): Каталог журнала.
+        """
+        self.directory = directory
+
+    def blocks(self) -> List[dict]:
+        """
+        Чтение индекса журнала.
+
+        :return: Описания блоков в порядке записи.
+        :rtype: list
+        """
+        path = os.path.join(self.directory, INDEX_NAME)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              identity: Optional[str] = None) -> List[dict]:
+        """
+        Выборка событий.
+
+        :param start: Начало диапазона времени (unix time), опциональный параметр.
+        :type start: float, optional
+        :param end: Конец диапазона времени (unix time), опциональный параметр.
+        :type end: float, optional
+        :param identity: Личность, опциональный параметр.
+        :type identity: str, optional
+        :return: Список событий (словари с ключами timestamp, camera, track, identity, score, box, crop)
+            по возрастанию времени.
+        :rtype: list
+        """
+        selected = [block for block in self.blocks()
+                    if (start is None or block['t_max'] >= start)
+                    and (end is None or block['t_min'] <= end)
+                    and (identity is None or identity in block['identities'])]
+
+        events = []
+        files = {}
+        try:
+            for block in selected:
+                segment = block['segment']
+                if segment not in files:
+                    files[segment] = open(os.path.join(self.directory, SEGMENT_TEMPLATE.format(segment)), 'rb')
+                f = files[segment]
+                f.seek(block['offset'])
+                length = struct.unpack('>I', f.read(4))[0]
+                columns = dict(np.load(io.BytesIO(f.read(length))))
+
+                mask = np.ones(block['count'], dtype=bool)
+                if start is not None:
+                    mask &= columns['timestamp'] >= start
+                if end is not None:
+                    mask &= columns['timestamp'] <= end
+                if identity is not None:
+                    mask &= columns['identity'] == identity
+                for i in np.flatnonzero(mask):
+                    events.append({
+                        'timestamp': float(columns['timestamp'][i]),
+                        'camera': str(columns['camera'][i]),
+                        'track': int(columns['track'][i]),
+                        'identity': str(columns['identity'][i]),
+                        'score': float(columns['score'][i]),
+                        'box': [int(x) for x in columns['box'][i]],
+                        'crop': str(columns['crop'][i]),
+                    })
+        finally:
+            for f in files.values():
+                f.close()
+        events.sort(key=lambda event: event['timestamp'])
+        return events
@@ -1,35 +1,85 @@
-import numpy as np
 import cv2
-from deepface import DeepFace
-import base64
 import time
 
 from fr_service.service import Service
+from fr_service.startup import StartupReport
+from fr_service.detection import DetectionCascade
+from fr_service.quality import FaceQuality
+from fr_service.gallery import Gallery, encode_matches
+from fr_service.shards import ShardedGallery
+from fr_service.event_log import EventLog
+from fr_service.frame_views import FrameViews
 from custom_cam.cam import Camera
 
+# DeepFace (и вместе с ним TensorFlow) загружается лениво в рабочем потоке, см. `_load_deepface`
+DeepFace = None
+
+
+def _load_deepface():
+    """
+    Ленивый импорт DeepFace. Повторные вызовы возвращают уже загруженный модуль.
+
+    :return: Класс-фасад DeepFace.
+    """
+    global DeepFace
+    if DeepFace is None:
+        from deepface import DeepFace as _DeepFace
+        DeepFace = _DeepFace
+    return DeepFace
+
+
 class ServiceFR(Service):
     """
     Класс ServiceFR расширяет функциональность базового класса Service,
     предоставляя обработку видеопотока и распознавания лиц.
     """
+    def __init__(self, ip_: str, port_: int, n_conn_=10, shards_=None, event_log_=None, event_log_crops_=False):
+        """
+        Инициализация сервиса. Тяжелые модели здесь не загружаются, см. `_do_job`.
+
+        :param ip_ (str): IP-адрес для привязки сервера.
+        :param port_ (int): Порт для привязки сервера.
+        :param n_conn_ (int): Максимальное количество подключений. По умолчанию 10.
+        :param shards_ (list): Адреса шард галереи (ip, port) для идентификации лиц, опциональный параметр.
+        :param event_log_ (str): Каталог журнала событий распознавания, опциональный параметр.
+        :param event_log_crops_ (bool): Сохранять ли в журнал кропы лиц. По умолчанию False.
+        """
+        super().__init__(ip_, port_, n_conn_)
+        self._startup = StartupReport()
+        self._models_ready = False
+
+        # Собственная шарда галереи и клиент распределенной галереи
+        self._gallery = Gallery()
+        self._shards = ShardedGallery(self, shards_) if shards_ else None
+
+        # Журнал событий распознавания
+        self._event_log = EventLog(event_log_, save_crops=event_log_crops_) if event_log_ else None
 
     def _do_job(self):
         """
         Переопределенный метод, выполняющий основную работу сервиса.
 
-        Включает в себя подключение к видеопотоку, обработку кадров и выполнение специализированных задач.
+        Включает в себя подключение к видеопотоку, загрузку моделей, обработку кадров и выполнение
+        специализированных задач. Сервер принимает запросы уже во время загрузки моделей.
         В случае исключений, передает их в обработчик запросов.
 
         :rtype: None
         """
         try:
+            # Новый отчёт о запуске: при перезапуске (restart) этапы не накапливаются в старом
+            self._startup = StartupReport()
+            self._models_ready = False
             self.__init_vars()
 
             # Подключение к RTSP потоку камеры
             url = 'rtsp://localhost:8554/mystream'  # rtsp-стрим
             url = 0  # webcam
-            cap = Camera(url)
-                
+            self._camera_id = str(url)
+            with self._startup.phase('camera'):
+                cap = Camera(url)
+
+            self.__load_models()
+
             while True:
                 if self.need_job_break:
                     return
@@ -49,6 +99,8 @@ class ServiceFR(Service):
                     break
         finally:    
             # Когда работа окончена, следует остановить сервис
+            if self._event_log is not None:
+                self._event_log.flush(timeout=5)
             cv2.destroyAllWindows()
             self.stop()
 
@@ -65,34 +117,22 @@ class ServiceFR(Service):
         """
 
         # https://docs.google.com/document/d/1wzAFfvVaIiOorsixK455Tr-vMfUOrCPk9_qPgOyx29U/edit
-        encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), 90]
+        # Представления кадра вычисляются один раз на кадр, см. FrameViews
         # GET FRAME
         if request == 'getFrame':
-            rgb = cv2.cvtColor(self._frame, cv2.COLOR_BGR2RGB)
-            img_buf = cv2.imencode('.jpg', rgb, encode_params)[1] # np.ndarray
-            data = np.array(img_buf).tobytes()
-            _str = base64.b64encode(data)
-            return _str.decode()
+            _str = self._views.get('frame')
+            return _str
         # GET DEPTH
         if request == 'getDepth':
-            # gray = cv2.cvtColor(self._depth)
-            img_buf = cv2.imencode('.jpg', self._depth, encode_params)[1] # np.ndarray
-            data = np.array(img_buf).tobytes()
-            _str = base64.b64encode(data)
-            return _str.decode()
+            _str = self._views.get('depth')
+            return _str
         # GET FACE
         if request == 'getFace':
-            rgb = cv2.cvtColor(self._target_face, cv2.COLOR_BGR2RGB)
-            img_buf = cv2.imencode('.jpg', rgb, encode_params)[1] # np.ndarray
-            data = np.array(img_buf).tobytes()
-            _str = base64.b64encode(data)
-            return _str.decode()
+            _str = self._views.get('face')
+            return _str
         # GET RECT
         if request == 'getRect':
-            if self._face_rect is None:
-                _str = '0,0,0,0'
-            else:    
-                _str = ','.join(str(x) for x in self._face_rect)
+            _str = self._views.get('rect')
             return _str
         # SET THRESHOLD
         if 'applyThreshold' in request:
@@ -103,8 +143,39 @@ class ServiceFR(Service):
             else:
                 _str = 'failed'
             return _str
+        # SET DETECTION SCALE
+        if 'applyDetectScale' in request:
+            new_scale = float(request.split('_')[1])
+            if 0.0 < new_scale <= 1.0:
+                self._cascade.scale = new_scale
+                _str = 'ok'
+            else:
+                _str = 'failed'
+            return _str
+        # SET DETECTION ROI MODE
+        if 'applyDetectRoi' in request:
+            new_roi = request.split('_')[1]
+            if new_roi in ('full', 'track', 'motion'):
+                self._detect_roi = new_roi
+                _str = 'ok'
+            else:
+                _str = 'failed'
+            return _str
+        # SET FACE QUALITY THRESHOLD
+        if request.startswith('applyQuality_'):
+            name, value = request[len('applyQuality_'):].rsplit('_', 1)
+            if self._quality.set_param(name, float(value)):
+                _str = 'ok'
+            else:
+                _str = 'failed'
+            return _str
+        # GET FACE QUALITY SKIP COUNTERS
+        if request == 'getQuality':
+            _str = str(self._quality)
+            return _str
         # BEGIN FACE TRACKING
         if request == 'startTracking':
+            self._track_id += 1
             self._set_target = True
             time.sleep(2)
             if self._target_face is None:
@@ -115,10 +186,7 @@ class ServiceFR(Service):
             return _str
         # GET TARGET
         if request == 'target':
-            if self._face_rect is None:
-                _str = 'empty'
-            else:    
-                _str = ','.join(str(x) for x in self._face_rect.items())
+            _str = self._views.get('target')
             return _str
         # STOP FACE TRACKING
         if request == 'stopTracking':
@@ -131,24 +199,66 @@ class ServiceFR(Service):
             return _str
         # SET GRAYSCALE COLORMAP
         if request == 'applyGrayscale':
-            self._colormap = 'gray'
+            self._views.set_colormap('gray')
             _str = 'ok'
-            return _str.decode()
+            return _str
         # SET RGB COLORMAP
         if request == 'applyRgb':
-            self._colormap = 'rgb'
+            self._views.set_colormap('rgb')
             _str = 'ok'
-            return _str.decode()
+            return _str
         # GET THRESHOLD VALUE
         if request == 'getThreshold':
             _str = str(self._threshold)
             return _str
         # GET COLORMAP
         if request == 'getColorMap':
-            _str = self._colormap
+            _str = self._views.colormap
+            return _str
+        # GET IDENTITY
+        if request == 'getIdentity':
+            _str = encode_matches(self._identity)
+            return _str
+        # GALLERY SHARD REQUESTS
+        _str = self._gallery.handle_request(request)
+        if _str is not None:
+            return _str
+        # GET STARTUP REPORT
+        if request == 'getStartup':
+            _str = str(self._startup)
             return _str
         return 'None'
 
+    def _status(self):
+        """
+        Переопределенный метод состояния сервиса: "loading", пока модели не загружены.
+
+        :rtype: str
+        """
+        if not self._models_ready:
+            return 'loading'
+        return super()._status()
+
+    # Вспомогательная функция
+    def __load_models(self):
+        """
+        Приватный метод для загрузки DeepFace и прогрева моделей детектора и ArcFace.
+
+        Длительность каждого этапа записывается в отчёт о запуске.
+
+        :rtype: None
+        """
+        with self._startup.phase('import_deepface'):
+            _load_deepface()
+        with self._startup.phase('build_detector'):
+            from deepface.detectors import FaceDetector
+            FaceDetector.build_model('mediapipe')
+        with self._startup.phase('build_arcface'):
+            DeepFace.build_model('ArcFace')
+        self._startup.finish()
+        self._models_ready = True
+        print('Startup:', self._startup)
+
     # Вспомогательная функция
     def __init_vars(self):
         """
@@ -167,7 +277,20 @@ class ServiceFR(Service):
         self._target_in = 0  # no more than 5 and less than 0
         self._total_frames = 0
         self._face_rect = None
-        self._colormap = 'rgb'
+        self._views = FrameViews()
+
+        # detection
+        self._quality = FaceQuality()
+        self._cascade = DetectionCascade()
+        self._detect_roi = 'full'  # full, track или motion
+
+        # identification
+        self._identity = []
+        self._top_k = 3
+
+        # event log
+        self._camera_id = ''
+        self._track_id = 0
         pass
 
     # Вспомогательная функция
@@ -178,50 +301,83 @@ class ServiceFR(Service):
         :rtype: None
         """
 
-        extractor = DeepFace.extract_faces(
-            self._frame, enforce_detection=False, 
-            detector_backend='mediapipe', align=False, 
-            target_size=[256, 256]
-        )
+        # Детектирование на уменьшенном кадре, кропы из кадра в полном разрешении
+        rois = None
+        if self._detect_roi == 'track' and self._face_rect is not None:
+            rois = [self._face_rect]
+        extractor = self._cascade.detect(self._frame, rois=rois,
+                                         use_motion=self._detect_roi == 'motion')
+        if not extractor and rois is not None:
+            # Лицо ушло из области трека - поиск по всему кадру
+            extractor = self._cascade.detect(self._frame)
+            if not extractor:
+                # Лица на кадре нет: сбрасываем область трека, чтобы не запускать детектор дважды на каждом кадре
+                self._face_rect = None
+
+        # Кандидат на вычисление эмбеддинга - лучшее* найденное на кадре лицо
+        # *имеющее наибольшее значение поля confidence
+        face_dict = None
+        if len(extractor) > 0 and extractor[0]['confidence'] >= 0.01\
+            and (self._set_target or self._target_embed is not None or self._shards is not None):
+            face_dict = extractor[0]
+            # Оценка качества только для кропа, который пойдет на вычисление эмбеддинга
+            if self._quality.reject_reason(face_dict['crop']) is not None:
+                face_dict = None
 
         # Установка отслеживаемого/идентифицируемого лица
         if self._set_target:
-            if extractor[0] is not None\
-                and extractor[0]['confidence'] > self._threshold:
+            if face_dict is not None\
+                and face_dict['confidence'] > self._threshold:
                 print('Target')
-                self._target_face = extractor[0]['face']
+                self._target_face = face_dict['face']
                 self._target_embed = DeepFace.represent(
-                    extractor[0]['face'].copy(), 
+                    face_dict['face'].copy(), 
                     detector_backend='skip', 
                     model_name='ArcFace')
 
         color = (0, 0, 255)
-        # Проверка: Лучшее* найденное на кадре лицо это наше таргетное лицо?
-        # *имеющее наибольшее значение поля confidence
-        for i, face_dict in enumerate(extractor):
-            if face_dict['confidence'] < 0.01 or self._target_embed is None:
-                break
+        # Проверка: кандидат это наше таргетное лицо?
+        if face_dict is not None\
+            and (self._target_embed is not None or self._shards is not None):
             try:
                 pred_embed = DeepFace.represent(face_dict['face'], detector_backend='skip', 
                                             model_name='ArcFace')
                 self._face_rect = face_dict['facial_area']
 
-                cos_sim_score = DeepFace.dst.findCosineDistance(
-                    self._target_embed[0]["embedding"], pred_embed[0]["embedding"])
-                
-                print("Cosine Similarity:", cos_sim_score)
-
-                if cos_sim_score < self._threshold:
-                    if self._target_in < 5:
-                        self._target_in += 1
-                    color = (0, 255, 0)
-                else:
-                    if self._target_in > 0:
-                        self._target_in -= 1
+                # Идентификация по распределенной галерее
+                if self._shards is not None:
+                    matches, _ = self._shards.search(pred_embed[0]["embedding"], k=self._top_k)
+                    self._identity = matches
+                    if self._event_log is not None:
+                        # Лицо записывается и без результата (все шарды не ответили или галерея пуста);
+                        # ближайшая запись галереи засчитывается, только если она ближе порога
+                        identity, score = matches[0] if matches else ('unknown', float('nan'))
+                        if score >= self._threshold:
+                            identity = 'unknown'
+                        self._event_log.log(self._camera_id, self._track_id, identity, score,
+                                            self._face_rect, face_dict['crop'])
+
+                if self._target_embed is not None:
+                    cos_sim_score = DeepFace.dst.findCosineDistance(
+                        self._target_embed[0]["embedding"], pred_embed[0]["embedding"])
+
+                    print("Cosine Similarity:", cos_sim_score)
+
+                    if cos_sim_score < self._threshold:
+                        if self._target_in < 5:
+                            self._target_in += 1
+                        color = (0, 255, 0)
+                    else:
+                        if self._target_in > 0:
+                            self._target_in -= 1
+
+                    # Сравнение с таргетом записывается отдельным событием, независимо от результата галереи
+                    if self._event_log is not None:
+                        identity = 'target' if cos_sim_score < self._threshold else 'not_target'
+                        self._event_log.log(self._camera_id, self._track_id, identity, cos_sim_score,
+                                            self._face_rect, face_dict['crop'])
             except Exception as e:
                 print('Search common face error!', e)
-            finally:
-                break
         # visualization
         if self._target_face is not None:
             pass
@@ -244,6 +400,9 @@ class ServiceFR(Service):
         cv2.imshow('Frame', self._frame)
         cv2.waitKey(10) 
         
+        # Новый кадр для ответов на запросы
+        self._views.update(self._frame, self._face_rect, self._target_face, self._depth)
+
         self._total_frames += 1
         # print(f'Frames (in/total): {self._target_in}/{self._total_frames}')
         pass
@@ -0,0 +1,179 @@
+import base64
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+import cv2
+
+COLORMAPS = ('rgb', 'gray')
+# Представления, зависящие от режима цветового пространства; остальные кэшируются одной записью на кадр
+COLORMAP_VIEWS = ('frame', 'face')
+
+
+def encode_jpg(img: np.ndarray) -> str:
+    """
+    Кодирование изображения в JPEG и base64 строку.
+
+    :param img: Изображение (uint8).
+    :type img: np.ndarray
+    :rtype: str
+    """
+    encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), 90]
+    img_buf = cv2.imencode('.jpg', img, encode_params)[1]  # np.ndarray
+    return base64.b64encode(img_buf.tobytes()).decode()
+
+
+class FrameViews:
+    """
+    Класс FrameViews - производные представления последнего обработанного кадра для ответов на запросы.
+
+    Каждое представление вычисляется не более одного раза на кадр, а для `COLORMAP_VIEWS` - не более одного раза
+    на кадр и режим цветового пространства. Повторные запросы отдаются из кэша. Кэш сбрасывается, когда через
+    `update` поступает следующий кадр.
+
+    :seq (int): Номер текущего кадра.
+    :colormap (str): Режим цветового пространства для изображений: "rgb" или "gray".
+    """
+    def __init__(self):
+        """
+        Инициализация без кадра.
+        """
+        self.lock = Lock()
+        self.seq = 0
+        self.colormap = 'rgb'
+        self.__state = {'seq': 0, 'frame': None, 'depth': None, 'face': None, 'rect': None}
+        self.__cache = {}
+        self.__builders = {
+            'frame': self.__build_frame,
+            'depth': self.__build_depth,
+            'face': self.__build_face,
+            'rect': self.__build_rect,
+            'target': self.__build_target,
+        }
+
+    def update(self, frame: np.ndarray, face_rect: Optional[dict] = None, target_face: Optional[np.ndarray] = None,
+               depth: Optional[np.ndarray] = None) -> None:
+        """
+        Смена кадра. Переданные массивы не должны изменяться после вызова.
+
+        :param frame: Кадр в формате BGR.
+        :type frame: np.ndarray
+        :param face_rect: Прямоугольник последнего найденного лица (x, y, w, h), опциональный параметр.
+        :type face_rect: dict, optional
+        :param target_face: Кроп отслеживаемого лица (RGB, float в [0, 1]), опциональный параметр.
+        :type target_face: np.ndarray, optional
+        :param depth: Карта глубины, опциональный параметр.
+        :type depth: np.ndarray, optional
+        :rtype: None
+        """
+        with self.lock:
+            self.seq += 1
+            self.__state = {'seq': self.seq, 'frame': frame, 'depth': depth, 'face': target_face,
+                            'rect': None if face_rect is None else dict(face_rect)}
+            self.__cache = {}
+
+    def set_colormap(self, colormap: str) -> bool:
+        """
+        Смена режима цветового пространства для изображений.
+
+        :param colormap: "rgb" или "gray".
+        :type colormap: str
+        :return: True, если режим установлен.
+        :rtype: bool
+        """
+        if colormap not in COLORMAPS:
+            return False
+        with self.lock:
+            self.colormap = colormap
+        return True
+
+    def get(self, name: str) -> str:
+        """
+        Представление текущего кадра: 'frame', 'depth', 'face' (изображения в base64), 'rect', 'target' (строки).
+
+        Вычисляется вне блокировки, чтобы не задерживать `update` из потока обработки кадров.
+
+        :param name: Название представления.
+        :type name: str
+        :rtype: str
+        """
+        with self.lock:
+            state, colormap = self.__state, self.colormap
+        return self.__view(name, state, colormap)
+
+    def __view(self, name: str, state: dict, colormap: str) -> str:
+        """
+        Приватный метод получения представления для снимка состояния кадра: из кэша или построением.
+
+        :param name: Название представления.
+        :param state: Снимок состояния кадра.
+        :param colormap: Режим цветового пространства.
+        :rtype: str
+        """
+        key = (name, colormap if name in COLORMAP_VIEWS else None)
+        with self.lock:
+            cached = self.__cache.get(key) if self.seq == state['seq'] else None
+        if cached is not None:
+            return cached
+        value = self.__builders[name](state, colormap)
+        with self.lock:
+            if self.seq == state['seq']:
+                self.__cache[key] = value
+        return value
+
+    def __build_frame(self, state: dict, colormap: str) -> str:
+        """
+        Приватный метод: кадр в выбранном цветовом пространстве, JPEG в base64.
+
+        :rtype: str
+        """
+        if state['frame'] is None:
+            return 'empty'
+        code = cv2.COLOR_BGR2RGB if colormap == 'rgb' else cv2.COLOR_BGR2GRAY
+        return encode_jpg(cv2.cvtColor(state['frame'], code))
+
+    def __build_depth(self, state: dict, colormap: str) -> str:
+        """
+        Приватный метод: карта глубины или, если ее нет, кадр в градациях серого, JPEG в base64.
+
+        :rtype: str
+        """
+        if state['depth'] is not None:
+            return encode_jpg(state['depth'])
+        if state['frame'] is None:
+            return 'empty'
+        return encode_jpg(cv2.cvtColor(state['frame'], cv2.COLOR_BGR2GRAY))
+
+    def __build_face(self, state: dict, colormap: str) -> str:
+        """
+        Приватный метод: кроп отслеживаемого лица или кадр целиком, если лица нет, JPEG в base64.
+
+        :rtype: str
+        """
+        if state['face'] is None:
+            return self.__view('frame', state, colormap)
+        face = (np.clip(state['face'], 0., 1.) * 255).astype(np.uint8)
+        if colormap == 'gray':
+            face = cv2.cvtColor(face, cv2.COLOR_RGB2GRAY)
+        return encode_jpg(face)
+
+    def __build_rect(self, state: dict, colormap: str) -> str:
+        """
+        Приватный метод: прямоугольник лица в формате "x,y,w,h" ("0,0,0,0", если лица нет).
+
+        :rtype: str
+        """
+        rect = state['rect']
+        if rect is None:
+            return '0,0,0,0'
+        return ','.join(str(rect[k]) for k in ('x', 'y', 'w', 'h'))
+
+    def __build_target(self, state: dict, colormap: str) -> str:
+        """
+        Приватный метод: прямоугольник отслеживаемого лица или "empty", если персона не определена.
+
+        :rtype: str
+        """
+        if state['face'] is None or state['rect'] is None:
+            return 'empty'
+        return self.__build_rect(state, colormap)
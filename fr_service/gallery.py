@@ -0,0 +1,169 @@
+import base64
+from threading import Lock
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def encode_embedding(embedding) -> str:
+    """
+    Кодирование эмбеддинга в base64 строку (float32) для передачи в запросе.
+
+    :param embedding: Эмбеддинг лица.
+    :type embedding: list | np.ndarray
+    :rtype: str
+    """
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode()
+
+
+def decode_embedding(data: str) -> np.ndarray:
+    """
+    Декодирование эмбеддинга из base64 строки, см. `encode_embedding`.
+
+    :param data: Эмбеддинг в base64.
+    :type data: str
+    :rtype: np.ndarray
+    """
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+def encode_matches(matches: List[Tuple[str, float]]) -> str:
+    """
+    Кодирование результатов поиска в формат ``<личность>:<расстояние>;...`` ("empty", если результатов нет).
+
+    :param matches: Список пар (личность, косинусное расстояние).
+    :type matches: list
+    :rtype: str
+    """
+    if not matches:
+        return 'empty'
+    return ';'.join(f'{identity}:{distance:.6f}' for identity, distance in matches)
+
+
+def decode_matches(data: str) -> List[Tuple[str, float]]:
+    """
+    Декодирование результатов поиска, см. `encode_matches`.
+
+    :param data: Результаты поиска в текстовом виде.
+    :type data: str
+    :rtype: list
+    """
+    if data in ('empty', ''):
+        return []
+    matches = []
+    for item in data.split(';'):
+        identity, distance = item.rsplit(':', 1)
+        matches.append((identity, float(distance)))
+    return matches
+
+
+class Gallery:
+    """
+    Класс Gallery - галерея эмбеддингов известных личностей (одна шарда общей галереи).
+
+    Эмбеддинги хранятся нормированными в одной матрице, поиск top-k выполняется одним матричным умножением.
+
+    :identities (list): Личность для каждой строки матрицы эмбеддингов.
+    :embeddings (np.ndarray): Нормированные эмбеддинги, форма (N, D).
+    """
+    def __init__(self):
+        """
+        Инициализация пустой галереи.
+        """
+        self.identities = []
+        self.embeddings = None
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    def add(self, identity: str, embedding) -> None:
+        """
+        Добавление эмбеддинга личности в галерею.
+
+        :param identity: Идентификатор личности.
+        :type identity: str
+        :param embedding: Эмбеддинг лица.
+        :type embedding: list | np.ndarray
+        :rtype: None
+        """
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        with self.lock:
+            if self.embeddings is None:
+                self.embeddings = vector
+            else:
+                self.embeddings = np.vstack([self.embeddings, vector])
+            self.identities.append(identity)
+
+    def search(self, embedding, k=1) -> List[Tuple[str, float]]:
+        """
+        Поиск k ближайших эмбеддингов по косинусному расстоянию.
+
+        :param embedding: Эмбеддинг запроса.
+        :type embedding: list | np.ndarray
+        :param k: Количество результатов.
+        :type k: int
+        :return: Список пар (личность, косинусное расстояние) по возрастанию расстояния.
+        :rtype: list
+        """
+        with self.lock:
+            embeddings, identities = self.embeddings, self.identities
+        if embeddings is None or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        distances = 1. - embeddings @ query
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(identities[i], float(distances[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        """
+        Сохранение галереи в файл .npz.
+
+        :param path: Путь к файлу.
+        :type path: str
+        :rtype: None
+        """
+        with self.lock:
+            embeddings = self.embeddings if self.embeddings is not None else np.empty((0, 0), np.float32)
+            np.savez(path, identities=np.array(self.identities), embeddings=embeddings)
+
+    def load(self, path: str) -> None:
+        """
+        Загрузка галереи из файла .npz, см. `save`.
+
+        :param path: Путь к файлу.
+        :type path: str
+        :rtype: None
+        """
+        data = np.load(path)
+        with self.lock:
+            self.identities = [str(x) for x in data['identities']]
+            self.embeddings = data['embeddings'] if len(self.identities) > 0 else None
+
+    def handle_request(self, request: str) -> Optional[str]:
+        """
+        Обработка запросов к галерее: `galleryAdd_<эмбеддинг>_<личность>`, `gallerySearch_<k>_<эмбеддинг>`,
+        `gallerySize`. Эмбеддинги передаются в base64, см. `encode_embedding`.
+
+        :param request: Входящий запрос.
+        :type request: str
+        :return: Ответ на запрос или None, если запрос не относится к галерее.
+        :rtype: str | None
+        """
+        # ADD TO GALLERY
+        if request.startswith('galleryAdd_'):
+            _, data, identity = request.split('_', 2)
+            self.add(identity, decode_embedding(data))
+            return 'ok'
+        # SEARCH GALLERY
+        if request.startswith('gallerySearch_'):
+            _, k, data = request.split('_', 2)
+            return encode_matches(self.search(decode_embedding(data), int(k)))
+        # GET GALLERY SIZE
+        if request == 'gallerySize':
+            return str(len(self))
+        return None
@@ -0,0 +1,126 @@
+import math
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+import cv2
+
+# Сторона квадрата, к которому приводится кроп перед оценкой (размер входа ArcFace)
+QUALITY_SIZE = 112
+
+
+def sharpness(gray: np.ndarray) -> float:
+    """
+    Оценка резкости: дисперсия лапласиана.
+
+    :param gray: Кроп лица в градациях серого, приведенный к `QUALITY_SIZE`.
+    :type gray: np.ndarray
+    :return: Дисперсия лапласиана; чем меньше значение, тем сильнее размыт кроп.
+    :rtype: float
+    """
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def asymmetry(gray: np.ndarray) -> float:
+    """
+    Грубая оценка поворота головы: различие кропа и его зеркального отражения.
+
+    Фронтальное лицо почти симметрично, у профиля одна половина заметно отличается от другой.
+
+    :param gray: Кроп лица в градациях серого, приведенный к `QUALITY_SIZE`.
+    :type gray: np.ndarray
+    :return: Среднее абсолютное различие в долях от 255, [0., 1.].
+    :rtype: float
+    """
+    diff = cv2.absdiff(gray, cv2.flip(gray, 1))
+    return float(diff.mean()) / 255.
+
+
+class FaceQuality:
+    """
+    Класс FaceQuality для отсеивания кропов лиц, на которые не стоит тратить вычисление эмбеддинга.
+
+    :params (dict): Пороги оценки: min_size, min_sharpness, max_asymmetry, min_brightness, max_brightness.
+    :stats (dict): Счетчики пропущенных кропов ('passed') и отброшенных по каждой причине
+        ('size', 'brightness', 'sharpness', 'pose').
+    """
+    def __init__(self, min_size=40, min_sharpness=20.0, max_asymmetry=0.2,
+                 min_brightness=40.0, max_brightness=220.0):
+        """
+        Инициализация порогов.
+
+        :param min_size (int): Минимальная сторона лица в пикселях исходного кадра. По умолчанию 40.
+        :param min_sharpness (float): Минимальная дисперсия лапласиана. По умолчанию 20.
+        :param max_asymmetry (float): Максимальная асимметрия (прокси поворота головы). По умолчанию 0.2.
+        :param min_brightness (float): Минимальная средняя яркость. По умолчанию 40.
+        :param max_brightness (float): Максимальная средняя яркость. По умолчанию 220.
+        """
+        self.params = {
+            'min_size': min_size,
+            'min_sharpness': min_sharpness,
+            'max_asymmetry': max_asymmetry,
+            'min_brightness': min_brightness,
+            'max_brightness': max_brightness,
+        }
+        self.lock = Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """
+        Обнуление счетчиков.
+
+        :rtype: None
+        """
+        with self.lock:
+            self.stats = {'passed': 0, 'size': 0, 'brightness': 0, 'sharpness': 0, 'pose': 0}
+
+    def set_param(self, name: str, value: float) -> bool:
+        """
+        Установка порога.
+
+        :param name: Название порога из `params`.
+        :type name: str
+        :param value: Новое конечное неотрицательное значение.
+        :type value: float
+        :return: True, если порог установлен.
+        :rtype: bool
+        """
+        if name not in self.params or not math.isfinite(value) or value < 0:
+            return False
+        self.params[name] = value
+        return True
+
+    def reject_reason(self, face: np.ndarray) -> Optional[str]:
+        """
+        Проверка кропа лица. Проверки идут от самой дешевой к самой дорогой, счетчики обновляются.
+
+        :param face: Кроп лица в формате BGR (uint8) в полном разрешении.
+        :type face: np.ndarray
+        :return: Причина отказа ('size', 'brightness', 'sharpness', 'pose') или None, если кроп годен.
+        :rtype: str | None
+        """
+        reason = None
+        if min(face.shape[:2]) < self.params['min_size']:
+            reason = 'size'
+        else:
+            gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+            gray = cv2.resize(gray, (QUALITY_SIZE, QUALITY_SIZE))
+            brightness = float(gray.mean())
+            if not self.params['min_brightness'] <= brightness <= self.params['max_brightness']:
+                reason = 'brightness'
+            elif sharpness(gray) < self.params['min_sharpness']:
+                reason = 'sharpness'
+            elif asymmetry(gray) > self.params['max_asymmetry']:
+                reason = 'pose'
+        with self.lock:
+            self.stats[reason or 'passed'] += 1
+        return reason
+
+    def __str__(self) -> str:
+        """
+        Строковое представление счетчиков в формате ``<причина>=<количество>;...``.
+
+        :rtype: str
+        """
+        with self.lock:
+            return ';'.join(f'{name}={count}' for name, count in self.stats.items())
@@ -1,7 +1,23 @@
+import argparse
+
 from fr_service.fr_service import ServiceFR
 
 
+def shard_address(value):
+    ip, port = value.rsplit(':', 1)
+    return ip, int(port)
+
+
 if __name__ == '__main__' :
-    service_var = ServiceFR(ip_="localhost", port_=8888)
+    parser = argparse.ArgumentParser(description='Сервис распознавания лиц')
+    parser.add_argument('--ip', default='localhost', help='IP-адрес сервиса')
+    parser.add_argument('--port', type=int, default=8888, help='Порт сервиса')
+    parser.add_argument('--shard', type=shard_address, action='append', default=None,
+                        help='Адрес шарды галереи в формате ip:port (можно указать несколько раз)')
+    parser.add_argument('--event-log', default=None, help='Каталог журнала событий распознавания')
+    parser.add_argument('--event-log-crops', action='store_true', help='Сохранять в журнал кропы лиц')
+    args = parser.parse_args()
+
+    service_var = ServiceFR(ip_=args.ip, port_=args.port, shards_=args.shard, event_log_=args.event_log,
+                            event_log_crops_=args.event_log_crops)
     service_var.start()
-    
\ No newline at end of file
@@ -4,6 +4,24 @@ import socket
 import struct
 from typing import Optional, Callable
 
+# Максимальная длина сообщения в логе: изображения и эмбеддинги в запросах и ответах занимают килобайты
+LOG_MESSAGE_LIMIT = 64
+
+
+def short_message(message: str, limit=LOG_MESSAGE_LIMIT) -> str:
+    """
+    Сокращение сообщения для вывода в лог.
+
+    :param message: Запрос или ответ.
+    :type message: str
+    :param limit: Максимальная длина. По умолчанию `LOG_MESSAGE_LIMIT`.
+    :type limit: int
+    :return: Сообщение целиком или его начало с указанием полной длины.
+    :rtype: str
+    """
+    if len(message) <= limit:
+        return message
+    return f'{message[:limit]}... ({len(message)} chars)'
 
 class Service(ABC):
     """
@@ -51,7 +69,6 @@ class Service(ABC):
         """
         data = bytearray()
         while len(data) < n:
-            print(n, len(data), n - len(data))
             packet = sock.recv(n - len(data))
             if not packet:
                 break
@@ -91,7 +108,7 @@ class Service(ABC):
         Приватный метод для обработки входящих запросов.
 
         Управляет запросами клиентов, обрабатывает команды управления сервисом (включить, выключить, закрыть,
-        перезапустить) и делегирует обработку остальных запросов `_request_handler`.
+        перезапустить), отвечает на запросы состояния (health, status) и делегирует обработку остальных запросов `_request_handler`.
 
         :rtype: None
         """
@@ -108,7 +125,8 @@ class Service(ABC):
                 try:
                     request = self.__recv_msg(client_socket)
                     request = request.decode("utf-8")
-                    print(f"Received: {request}")
+                    # Печатается только команда: параметры запросов к галерее - эмбеддинги в base64
+                    print(f"Received: {request.split('_', 1)[0]}")
 
                     if request.lower() == "disable":
                         self.pause()
@@ -116,6 +134,10 @@ class Service(ABC):
                     elif request.lower() == "enable":
                         self.unpause()
                         self.__send_msg(client_socket, "enable success".encode("utf-8"))
+                    elif request.lower() == "health":
+                        self.__send_msg(client_socket, "ok".encode("utf-8"))
+                    elif request.lower() == "status":
+                        self.__send_msg(client_socket, self._status().encode("utf-8"))
                     elif request.lower() == "close" or request.lower() == "restart":
                         self.stop()
                         service_closing_commands.append(request.lower())
@@ -151,8 +173,21 @@ class Service(ABC):
         """
         pass
 
+    def _status(self) -> str:
+        """
+        Защищенный метод, возвращающий состояние сервиса для запроса `status`.
+
+        Может быть переопределен, чтобы сообщать о специфичных этапах (например, загрузке моделей).
+
+        :return: "running" или "paused".
+        :rtype: str
+        """
+        return "running" if self.need_job_pause else "paused"
+
     def _run_client(self, ip: str, port: int, request: str,
-                    response_handler: Optional[Callable[[str], None]] = None) -> None:
+                    response_handler: Optional[Callable[[str], None]] = None,
+                    timeout: Optional[float] = None,
+                    error_handler: Optional[Callable[[Exception], None]] = None) -> None:
         """
         Вспомогательный защищенный метод для отправления запроса другому сервису. Устанавливает соединение, отправляет
         запрос, получает ответ, решает, что делать с ответом.
@@ -165,28 +200,37 @@ class Service(ABC):
         :type request: str
         :param response_handler: Функция обратного вызова для обработки ответа сервера, опциональный параметр.
         :type response_handler: Callable[[str], None], optional
+        :param timeout: Таймаут сокета в секундах, опциональный параметр (по умолчанию без таймаута).
+        :type timeout: float, optional
+        :param error_handler: Функция обратного вызова при ошибке запроса, опциональный параметр.
+        :type error_handler: Callable[[Exception], None], optional
         :rtype: None
         """
-        global client
+        # Сокет локальный: запросы из параллельных потоков не должны делить одно соединение
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
-            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client.settimeout(timeout)
             client.connect((ip, port))
 
             self.__send_msg(client, request.encode("utf-8"))
             response = self.__recv_msg(client)
             response = response.decode("utf-8")
-            print(f"Received: {response}")
+            print(f"Received: {short_message(response)}")
 
             if response_handler is not None:
                 response_handler(response)
         except Exception as e:
             print(f"Client error when handling client: {e}")
+            if error_handler is not None:
+                error_handler(e)
         finally:
             client.close()
             print("Connection to server closed")
 
     # public:
-    def run_client(self, ip: str, port: int, request: str, response_handler: Optional[Callable] = None) -> None:
+    def run_client(self, ip: str, port: int, request: str, response_handler: Optional[Callable] = None,
+                   timeout: Optional[float] = None,
+                   error_handler: Optional[Callable[[Exception], None]] = None) -> None:
         """
         Публичный метод для выполнения клиентского подключения и отправки запроса в отдельном потоке.
 
@@ -198,9 +242,14 @@ class Service(ABC):
         :type request: str
         :param response_handler: Функция обратного вызова для обработки ответа сервера, опциональный параметр.
         :type response_handler: Callable[[str], None], optional
+        :param timeout: Таймаут сокета в секундах, опциональный параметр (по умолчанию без таймаута).
+        :type timeout: float, optional
+        :param error_handler: Функция обратного вызова при ошибке запроса, опциональный параметр.
+        :type error_handler: Callable[[Exception], None], optional
         :rtype: None
         """
-        client_thread = threading.Thread(target=self._run_client, args=(ip, port, request, response_handler,))
+        client_thread = threading.Thread(target=self._run_client,
+                                         args=(ip, port, request, response_handler, timeout, error_handler,))
         client_thread.start()
 
     def start(self) -> None:
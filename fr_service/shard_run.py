@@ -0,0 +1,14 @@
+import argparse
+
+from fr_service.shards import ServiceShard
+
+
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description='Шарда галереи лиц')
+    parser.add_argument('--ip', default='localhost', help='IP-адрес шарды')
+    parser.add_argument('--port', type=int, default=8900, help='Порт шарды')
+    parser.add_argument('--gallery', default=None, help='Файл .npz с галереей')
+    args = parser.parse_args()
+
+    service_shard = ServiceShard(ip_=args.ip, port_=args.port, gallery_path=args.gallery)
+    service_shard.start()
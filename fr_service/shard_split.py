@@ -0,0 +1,21 @@
+import argparse
+import os
+
+from fr_service.gallery import Gallery
+from fr_service.shards import split_gallery
+
+
+if __name__ == '__main__' :
+    parser = argparse.ArgumentParser(description='Разбиение галереи лиц на файлы шард')
+    parser.add_argument('--gallery', required=True, help='Файл .npz с полной галереей')
+    parser.add_argument('--shards', type=int, required=True, help='Количество шард')
+    args = parser.parse_args()
+
+    gallery = Gallery()
+    gallery.load(args.gallery)
+    base, ext = os.path.splitext(args.gallery)
+    # i-й файл соответствует i-му адресу --shard при запуске сервиса распознавания
+    for i, shard in enumerate(split_gallery(gallery, args.shards), start=1):
+        path = f'{base}_{i}{ext}'
+        shard.save(path)
+        print(f'{path}: {len(shard)}')
@@ -0,0 +1,184 @@
+import heapq
+import os
+import threading
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from fr_service.service import Service
+from fr_service.gallery import Gallery, encode_embedding, decode_matches
+
+
+def shard_index(identity: str, n_shards: int) -> int:
+    """
+    Номер шарды, хранящей личность. Разбиение стабильно между запусками (crc32 от идентификатора).
+
+    :param identity: Идентификатор личности.
+    :type identity: str
+    :param n_shards: Количество шард.
+    :type n_shards: int
+    :rtype: int
+    """
+    return zlib.crc32(identity.encode('utf-8')) % n_shards
+
+
+def split_gallery(gallery: Gallery, n_shards: int) -> List[Gallery]:
+    """
+    Разбиение галереи на шарды по тому же правилу, что и :meth:`ShardedGallery.shard_for`:
+    i-я шарда соответствует i-му адресу в списке шард клиента.
+
+    :param gallery: Исходная галерея.
+    :type gallery: Gallery
+    :param n_shards: Количество шард.
+    :type n_shards: int
+    :rtype: list
+    """
+    shards = [Gallery() for _ in range(n_shards)]
+    for identity, embedding in zip(gallery.identities, gallery.embeddings if gallery.embeddings is not None else []):
+        shards[shard_index(identity, n_shards)].add(identity, embedding)
+    return shards
+
+
+class ServiceShard(Service):
+    """
+    Класс ServiceShard - узел, хранящий одну шарду общей галереи и отвечающий на запросы к ней.
+
+    Не работает с камерой и не загружает модели, поэтому несколько шард можно запустить локально
+    в отдельных процессах (см. `shard_run.py`). Если задан файл галереи, при остановке шарды галерея
+    (вместе с добавленными запросами `galleryAdd_`) сохраняется в него.
+    """
+    def __init__(self, ip_: str, port_: int, n_conn_=10, gallery_path: Optional[str] = None):
+        """
+        Инициализация шарды.
+
+        :param ip_ (str): IP-адрес для привязки сервера.
+        :param port_ (int): Порт для привязки сервера.
+        :param n_conn_ (int): Максимальное количество подключений. По умолчанию 10.
+        :param gallery_path (str): Файл .npz с галереей, опциональный параметр. Если файла нет,
+            шарда начинает с пустой галереи и создает его при остановке.
+        """
+        super().__init__(ip_, port_, n_conn_)
+        self._gallery = Gallery()
+        self._gallery_path = gallery_path
+        if gallery_path is not None and os.path.exists(gallery_path):
+            self._gallery.load(gallery_path)
+
+    def _do_job(self):
+        """
+        Переопределенный метод основной работы: шарда только отвечает на запросы.
+        При остановке галерея сохраняется в файл, если он задан.
+
+        :rtype: None
+        """
+        while not self.need_job_break:
+            time.sleep(0.1)
+        if self._gallery_path is not None:
+            self._gallery.save(self._gallery_path)
+            print(f"Gallery saved: {self._gallery_path} ({len(self._gallery)})")
+
+    def _request_handler(self, request):
+        """
+        Переопределенный метод обработки запросов к галерее, см. :meth:`fr_service.gallery.Gallery.handle_request`.
+
+        :param request: Входящий запрос.
+        :type request: str
+        :return: Ответ на запрос.
+        :rtype: str
+        """
+        result = self._gallery.handle_request(request)
+        if result is None:
+            return 'None'
+        return result
+
+
+class ShardedGallery:
+    """
+    Класс ShardedGallery - клиент галереи, распределенной по нескольким узлам.
+
+    Запрос поиска рассылается всем шардам параллельно через :meth:`fr_service.service.Service.run_client`,
+    результаты объединяются в общий top-k. Если шарда не ответила до истечения `deadline`, возвращаются
+    результаты ответивших шард.
+
+    :service (Service): Сервис, через который отправляются запросы.
+    :shards (list): Адреса шард, список пар (ip, port).
+    :deadline (float): Время ожидания ответов в секундах.
+    """
+    def __init__(self, service: Service, shards: List[Tuple[str, int]], deadline=0.2):
+        """
+        Инициализация клиента.
+
+        :param service (Service): Сервис для отправки запросов.
+        :param shards (list): Адреса шард, список пар (ip, port).
+        :param deadline (float): Время ожидания ответов в секундах. По умолчанию 0.2.
+        """
+        self.service = service
+        self.shards = list(shards)
+        self.deadline = deadline
+
+    def shard_for(self, identity: str) -> Tuple[str, int]:
+        """
+        Адрес шарды, хранящей личность, см. `shard_index`.
+
+        :param identity: Идентификатор личности.
+        :type identity: str
+        :rtype: tuple
+        """
+        return self.shards[shard_index(identity, len(self.shards))]
+
+    def add(self, identity: str, embedding) -> None:
+        """
+        Добавление эмбеддинга личности в соответствующую шарду (асинхронно).
+
+        :param identity: Идентификатор личности.
+        :type identity: str
+        :param embedding: Эмбеддинг лица.
+        :type embedding: list | np.ndarray
+        :rtype: None
+        """
+        ip, port = self.shard_for(identity)
+        self.service.run_client(ip, port, f'galleryAdd_{encode_embedding(embedding)}_{identity}')
+
+    def search(self, embedding, k=5) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Поиск k ближайших личностей по всем шардам.
+
+        :param embedding: Эмбеддинг запроса.
+        :type embedding: list | np.ndarray
+        :param k: Количество результатов.
+        :type k: int
+        :return: Список пар (личность, косинусное расстояние) по возрастанию расстояния
+            и количество шард, ответивших до истечения `deadline`.
+        :rtype: tuple
+        """
+        request = f'gallerySearch_{k}_{encode_embedding(embedding)}'
+        matches = []
+        answered = set()
+        finished = set()
+        done = threading.Condition()
+
+        # Шарда считается завершенной и при ответе, и при ошибке (например, отказе в соединении),
+        # чтобы ожидание не тянулось до `deadline`, когда исход уже известен
+        def make_handlers(shard):
+            def response_handler(response):
+                shard_matches = decode_matches(response)
+                with done:
+                    matches.extend(shard_matches)
+                    answered.add(shard)
+                    finished.add(shard)
+                    done.notify()
+
+            def error_handler(error):
+                with done:
+                    finished.add(shard)
+                    done.notify()
+
+            return response_handler, error_handler
+
+        for shard, (ip, port) in enumerate(self.shards):
+            response_handler, error_handler = make_handlers(shard)
+            self.service.run_client(ip, port, request, response_handler, timeout=self.deadline,
+                                    error_handler=error_handler)
+
+        with done:
+            done.wait_for(lambda: len(finished) == len(self.shards), timeout=self.deadline)
+            return heapq.nsmallest(k, matches, key=lambda m: m[1]), len(answered)
@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+
+class StartupReport:
+    """
+    Класс StartupReport для замера длительности этапов запуска сервиса.
+
+    :started_at (float): Момент создания отчёта (``time.perf_counter``).
+    :phases (list): Список пар (название этапа, длительность в секундах) в порядке завершения.
+    :duration (float | None): Полная длительность запуска, фиксируется `finish`.
+    """
+    def __init__(self):
+        """
+        Инициализация пустого отчёта.
+        """
+        self.started_at = time.perf_counter()
+        self.phases = []
+        self.duration = None
+        self.lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Контекстный менеджер для замера одного этапа запуска.
+
+        :param name: Название этапа.
+        :type name: str
+        """
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((name, time.perf_counter() - begin))
+
+    def finish(self) -> None:
+        """
+        Фиксация полной длительности запуска. Повторные вызовы не меняют значение.
+
+        :rtype: None
+        """
+        with self.lock:
+            if self.duration is None:
+                self.duration = time.perf_counter() - self.started_at
+
+    def total(self) -> float:
+        """
+        Полная длительность запуска или, если запуск ещё не завершён, время с создания отчёта.
+
+        :rtype: float
+        """
+        with self.lock:
+            if self.duration is not None:
+                return self.duration
+        return time.perf_counter() - self.started_at
+
+    def __str__(self) -> str:
+        """
+        Строковое представление отчёта в формате ``<этап>=<секунды>;...;total=<секунды>``.
+
+        :rtype: str
+        """
+        with self.lock:
+            items = [f'{name}={duration:.3f}' for name, duration in self.phases]
+        items.append(f'total={self.total():.3f}')
+        return ';'.join(items)